@@ -0,0 +1,135 @@
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pyarrow import csv as pacsv
+
+
+RENAME = {
+    "InvoiceNo": "invoice_no",
+    "StockCode": "stock_code",
+    "Description": "description",
+    "Quantity": "quantity",
+    "InvoiceDate": "invoice_date",
+    "UnitPrice": "unit_price",
+    "CustomerID": "customer_id",
+    "Country": "country",
+}
+
+# fixed output schema for both fact writers (same narrowing as save_outputs)
+SCHEMA = pa.schema([
+    ("invoice_no", pa.string()),
+    ("stock_code", pa.string()),
+    ("description", pa.string()),
+    # float64, not int32: the writer schema is fixed up front, so there is no
+    # safe fallback if a later batch carries a fractional quantity
+    ("quantity", pa.float64()),
+    ("invoice_date", pa.timestamp("ns")),
+    ("unit_price", pa.float32()),
+    ("customer_id", pa.int32()),
+    ("country", pa.string()),
+    ("is_credit_note", pa.bool_()),
+    ("line_total", pa.float64()),
+    ("invoice_date_date", pa.date32()),
+    ("invoice_ym", pa.int32()),
+])
+
+
+def _open_raw(path: Path) -> pacsv.CSVStreamingReader:
+    """Incremental CSV reader: one ~32MB block of rows live at a time."""
+    return pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(encoding="latin-1", block_size=32 << 20),
+        convert_options=pacsv.ConvertOptions(
+            strings_can_be_null=True,
+            column_types={
+                "InvoiceNo": pa.string(),
+                "StockCode": pa.string(),
+                # parsed in _clean_batch so malformed dates null out and drop
+                # instead of aborting the stream mid-file
+                "InvoiceDate": pa.string(),
+                "Quantity": pa.float64(),
+                "UnitPrice": pa.float64(),
+                "CustomerID": pa.float64(),
+            },
+        ),
+    )
+
+
+def _clean_batch(batch: pa.RecordBatch) -> pa.Table:
+    """basic_clean on one record batch, using Arrow compute kernels only."""
+    tbl = pa.Table.from_batches([batch])
+    tbl = tbl.rename_columns([RENAME.get(c, c) for c in tbl.schema.names])
+
+    # coerce invoice_date: unmatched values become null (dropped below)
+    raw_date = tbl["invoice_date"]
+    parsed = pc.coalesce(
+        pc.strptime(raw_date, format="%m/%d/%Y %H:%M", unit="ns", error_is_null=True),
+        pc.strptime(raw_date, format="%m/%d/%Y %H:%M:%S", unit="ns", error_is_null=True),
+        pc.strptime(raw_date, format="%Y-%m-%dT%H:%M:%S", unit="ns", error_is_null=True),
+        pc.strptime(raw_date, format="%Y-%m-%d %H:%M:%S", unit="ns", error_is_null=True),
+    )
+    i = tbl.schema.get_field_index("invoice_date")
+    tbl = tbl.set_column(i, "invoice_date", parsed)
+
+    # drop unusable rows (same subset as basic_clean)
+    keep = pc.and_kleene(
+        pc.is_valid(tbl["invoice_date"]),
+        pc.and_kleene(pc.is_valid(tbl["stock_code"]), pc.is_valid(tbl["description"])),
+    )
+    tbl = tbl.filter(keep)
+
+    # text hygiene
+    for name in ("description", "stock_code", "country"):
+        i = tbl.schema.get_field_index(name)
+        tbl = tbl.set_column(i, name, pc.utf8_trim_whitespace(tbl[name]))
+
+    # derived
+    inv_date = tbl["invoice_date"]
+    tbl = tbl.append_column(
+        "is_credit_note", pc.fill_null(pc.starts_with(tbl["invoice_no"], "C"), False)
+    )
+    tbl = tbl.append_column("line_total", pc.multiply(tbl["quantity"], tbl["unit_price"]))
+    tbl = tbl.append_column("invoice_date_date", inv_date.cast(pa.date32()))
+    ym = pc.add(pc.multiply(pc.year(inv_date), 100), pc.month(inv_date))
+    tbl = tbl.append_column("invoice_ym", ym)
+
+    return tbl.select(SCHEMA.names).cast(SCHEMA)
+
+
+def _sales_mask(tbl: pa.Table) -> pa.ChunkedArray:
+    """True for valid sales lines; nulls count as returns."""
+    mask = pc.and_kleene(
+        pc.invert(tbl["is_credit_note"]),
+        pc.and_kleene(
+            pc.greater(tbl["quantity"], 0), pc.greater(tbl["unit_price"], 0)
+        ),
+    )
+    return pc.fill_null(mask, False)
+
+
+def run_stream(raw_path: Path, out_dir: Path) -> tuple[Path, Path]:
+    """Read -> clean -> split -> write, one batch at a time (bounded memory)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sales_parq = out_dir / "fact_sales_lines.parquet"
+    returns_parq = out_dir / "fact_returns_lines.parquet"
+
+    n_sales = n_returns = 0
+    with (
+        pq.ParquetWriter(sales_parq, SCHEMA, compression="snappy") as sales_writer,
+        pq.ParquetWriter(returns_parq, SCHEMA, compression="snappy") as returns_writer,
+    ):
+        for batch in _open_raw(raw_path):
+            tbl = _clean_batch(batch)
+            mask = _sales_mask(tbl)
+            sales = tbl.filter(mask)
+            returns = tbl.filter(pc.invert(mask))
+            sales_writer.write_table(sales)
+            returns_writer.write_table(returns)
+            n_sales += len(sales)
+            n_returns += len(returns)
+
+    print(f"[stream] sales={n_sales} returns={n_returns}")
+    print(f"[save] {sales_parq}")
+    print(f"[save] {returns_parq}")
+    return sales_parq, returns_parq
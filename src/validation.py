@@ -2,25 +2,69 @@ import argparse
 from pathlib import Path
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+try:
+    from numba import njit, prange
+
+    @njit(parallel=True, cache=True)
+    def count_mismatches(lt: np.ndarray, qt: np.ndarray, up: np.ndarray, rtol: float, atol: float) -> int:
+        """Fused quantity*price vs line_total check: one pass, no temporaries."""
+        bad = 0
+        for i in prange(lt.shape[0]):
+            ref = qt[i] * up[i]
+            if not (abs(lt[i] - ref) <= atol + rtol * abs(ref)):  # NaN counts as mismatch
+                bad += 1
+        return bad
+
+except ImportError:
+    def count_mismatches(lt: np.ndarray, qt: np.ndarray, up: np.ndarray, rtol: float, atol: float) -> int:
+        """NumPy fallback when numba is not installed."""
+        return int((~np.isclose(lt, qt * up, rtol=rtol, atol=atol)).sum())
 
 
 def edges_spaces(s: pd.Series) -> int:
-    """Count values with leading or trailing spaces."""
-    s = s.astype(str)
-    return ((s.str[:1] == " ") | (s.str[-1:] == " ")).sum()
+    """Count values with leading or trailing spaces (nulls don't count)."""
+    arr = pa.array(s.astype("string"), from_pandas=True)
+    ragged = pc.or_(pc.starts_with(arr, " "), pc.ends_with(arr, " "))
+    total = pc.sum(ragged).as_py()
+    return total or 0
+
+
+REQUIRED_COLS = [
+    "invoice_no", "stock_code", "description", "quantity",
+    "invoice_date", "unit_price", "customer_id", "country",
+    "is_credit_note", "line_total",
+]
+
+
+def load_fact(path: Path) -> pd.DataFrame:
+    """Load a fact table, preferring the parquet sidecar over the CSV.
+
+    Parquet skips type re-inference and lets us project just the validated
+    columns; the CSV path is kept as a fallback.
+    """
+    parq = path.with_suffix(".parquet")
+    if parq.exists():
+        available = set(pq.read_schema(parq).names)
+        cols = [c for c in REQUIRED_COLS if c in available]
+        df = pd.read_parquet(parq, columns=cols)
+        print(f"[load] {parq} (columns projected)")
+        return df
+    if path.exists():
+        return pd.read_csv(path)
+    raise FileNotFoundError(f"Missing file: {path} (no parquet sidecar either)")
 
 
 def run_validation(sales_path: Path, returns_path: Path) -> pd.DataFrame:
     """Validate cleaned outputs (sales/returns) without re-running the ETL."""
-    if not sales_path.exists() or not returns_path.exists():
-        raise FileNotFoundError(f"Missing files: {sales_path} or {returns_path}")
-
-    sales = pd.read_csv(sales_path)
-    returns = pd.read_csv(returns_path)
-    df = pd.concat([
-        sales.assign(_source="sales"),
-        returns.assign(_source="returns")
-    ], ignore_index=True)
+    sales = load_fact(sales_path)
+    returns = load_fact(returns_path)
+    # no concat: the shared checks run on each side and aggregate, so we never
+    # materialize a copy the size of both inputs
+    parts = [sales, returns]
 
     results = []
 
@@ -28,38 +72,38 @@ def run_validation(sales_path: Path, returns_path: Path) -> pd.DataFrame:
         results.append({"check": name, "ok": bool(ok), "detail": detail})
 
     # Required columns
-    required_cols = [
-        "invoice_no","stock_code","description","quantity",
-        "invoice_date","unit_price","customer_id","country",
-        "is_credit_note","line_total"
-    ]
-    add("columns_present", set(required_cols).issubset(df.columns),
-        detail=str(sorted(set(required_cols) - set(df.columns))))
+    missing = sorted(set().union(*(set(REQUIRED_COLS) - set(p.columns) for p in parts)))
+    add("columns_present", not missing, detail=str(missing))
+
+    # numeric columns converted once per side; every later check reuses these
+    def nums(part, col):
+        return pd.to_numeric(part[col], errors="coerce").to_numpy(dtype=np.float64)
+
+    s_qt, s_up, s_lt = (nums(sales, c) for c in ("quantity", "unit_price", "line_total"))
+    r_qt, r_up, r_lt = (nums(returns, c) for c in ("quantity", "unit_price", "line_total"))
 
     # Basic dtypes (best effort)
     try:
-        pd.to_datetime(df["invoice_date"], errors="raise")
-        q_ok = pd.to_numeric(df["quantity"], errors="coerce").notna().all()
-        p_ok = pd.to_numeric(df["unit_price"], errors="coerce").notna().all()
+        for p in parts:
+            pd.to_datetime(p["invoice_date"], errors="raise")
+        q_ok = not (np.isnan(s_qt).any() or np.isnan(r_qt).any())
+        p_ok = not (np.isnan(s_up).any() or np.isnan(r_up).any())
         add("dtypes_basic(invoice_date/quantity/unit_price)", q_ok and p_ok)
     except Exception as e:
         add("dtypes_basic(invoice_date/quantity/unit_price)", False, detail=str(e))
 
     # Trims (string cleaning)
-    add("trim_description", edges_spaces(df["description"]) == 0)
-    add("trim_stock_code", edges_spaces(df["stock_code"]) == 0)
-    add("trim_country", edges_spaces(df["country"]) == 0)
+    for col in ("description", "stock_code", "country"):
+        add(f"trim_{col}", sum(edges_spaces(p[col]) for p in parts) == 0)
 
     # line_total consistency
-    qt = pd.to_numeric(df["quantity"], errors="coerce")
-    up = pd.to_numeric(df["unit_price"], errors="coerce")
-    lt = pd.to_numeric(df["line_total"], errors="coerce")
-    close = np.isclose(lt, qt * up, rtol=1e-6, atol=1e-9)
-    add("line_total_consistency", close.all(), detail=f"mismatches={(~close).sum()}")
-
-    # sales checks
-    s_q_ok = (pd.to_numeric(sales["quantity"], errors="coerce") > 0).all()
-    s_p_ok = (pd.to_numeric(sales["unit_price"], errors="coerce") > 0).all()
+    bad = count_mismatches(s_lt, s_qt, s_up, 1e-6, 1e-9)
+    bad += count_mismatches(r_lt, r_qt, r_up, 1e-6, 1e-9)
+    add("line_total_consistency", bad == 0, detail=f"mismatches={bad}")
+
+    # sales checks (cached arrays)
+    s_q_ok = (s_qt > 0).all()
+    s_p_ok = (s_up > 0).all()
     s_c_ok = (~sales["is_credit_note"].astype(bool)).all()
     add("quantity_positive_in_sales", s_q_ok)
     add("unit_price_positive_in_sales", s_p_ok)